@@ -7,6 +7,9 @@ Scopes access to a single folder:
 
 Exposes a small HTTP API (list, read, write) so an OpenClaw tool can call it.
 Run: uvicorn drive_playground_service:app --host 0.0.0.0 --port 8765
+     (or python drive_playground_service.py). When starting uvicorn with --workers N,
+     also set DRIVE_PLAYGROUND_WORKERS=N: /list responses are cached per process
+     unless it is above 1, and workers would serve listings missing each other's writes.
 
 Setup:
   1. Create a project in Google Cloud Console, enable Google Drive API.
@@ -20,21 +23,41 @@ Setup:
      token.json (add to .gitignore).
 """
 
+import asyncio
+import base64
+import hashlib
+import hmac
 import json
 import os
 import io
+import logging
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
 from pathlib import Path
+from urllib.parse import quote
 
-from fastapi import FastAPI, HTTPException, Header, Query
-from fastapi.responses import PlainTextResponse
+from fastapi import Depends, FastAPI, HTTPException, Header, Query, Request as APIRequest
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from cachetools import LRUCache, TTLCache
+import orjson
 
 # Google Drive
+from google.auth.exceptions import RefreshError
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest, MediaIoBaseUpload, MediaIoBaseDownload, build_http
 
 # -----------------------------------------------------------------------------
 # Config
@@ -45,29 +68,136 @@ CREDENTIALS_FILE = SCRIPT_DIR / "credentials.json"
 TOKEN_FILE = SCRIPT_DIR / "token.json"
 # Folder path to resolve if DRIVE_PLAYGROUND_FOLDER_ID is not set (under My Drive root)
 PLAYGROUND_PATH = ["Personal", "AI Research", "OpenClaw Playground"]
+# Drive query templates and field masks (only fields callers actually use)
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+LIST_Q_TMPL = "'{}' in parents and trashed = false"
+NAME_Q_TMPL = "'{}' in parents and name = '{}' and trashed = false"
+LIST_FIELDS = "nextPageToken, files(id, name, mimeType, modifiedTime, size)"
+READ_META_FIELDS = "mimeType, parents, modifiedTime"
+BATCH_READ_META_FIELDS = "mimeType, parents, modifiedTime, size"
+DIRECT_META_FIELDS = "id, name, mimeType, parents, modifiedTime, size"
+EXISTING_FIELDS = "files(id, name)"
+# Drive calls failing with 429/5xx (or a 403 rate limit) are retried with exponential backoff
+DRIVE_MAX_RETRIES = 5
+RETRY_MAX_DELAY = 30
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "RATE_LIMIT_EXCEEDED"}
+# Refresh the OAuth token in the background this many seconds before it expires
+# (must exceed google-auth's 225 s threshold, after which requests refresh inline)
+CREDS_REFRESH_MARGIN = 300
+# Threads available to asyncio.to_thread for blocking Drive calls
+DRIVE_IO_WORKERS = 32
+# Bytes per Drive media request when streaming downloads (library default is 100 MB)
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# /write_batch: sub-requests per Drive batch call, max items per call, parallel uploads
+BATCH_MAX_REQUESTS = 25
+WRITE_BATCH_MAX_ITEMS = 100
+WRITE_BATCH_CONCURRENCY = 8
+# /write_raw bodies are held in memory up to this size, then spooled to a temp file
+UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+# Larger /write_raw bodies are rejected with 413
+UPLOAD_MAX_BYTES = int(os.environ.get("DRIVE_PLAYGROUND_MAX_UPLOAD_BYTES") or 512 * 1024 * 1024)
+# Uploads up to RESUMABLE_THRESHOLD go in one multipart request; larger ones are
+# resumable in UPLOAD_CHUNK_SIZE pieces (must be a multiple of 256 KB)
+RESUMABLE_THRESHOLD = 5 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# /files/batch_read: max IDs per call, parallel downloads (Drive allows ~10 requests/s per user)
+BATCH_READ_MAX_ITEMS = 100
+BATCH_READ_CONCURRENCY = 8
+# Content is returned inline (base64), so cap bytes per file and per call; larger files
+# should be read through /files/{id}/content, which streams
+BATCH_READ_MAX_FILE_BYTES = 10 * 1024 * 1024
+BATCH_READ_MAX_TOTAL_BYTES = 50 * 1024 * 1024
+# /list pages are cached for LIST_CACHE_TTL seconds; small /read bodies are cached
+# until the file's modifiedTime changes
+LIST_CACHE_TTL = 30
+# A worker can't see writes handled by its siblings, so /list is only cached when a
+# single worker runs (the launcher and Railway entrypoint export DRIVE_PLAYGROUND_WORKERS)
+LIST_CACHE_ENABLED = int(os.environ.get("DRIVE_PLAYGROUND_WORKERS") or "1") <= 1
+READ_CACHE_MAX_FILE_BYTES = 1024 * 1024
+READ_CACHE_MAX_TOTAL_BYTES = 32 * 1024 * 1024
+# /files/{id}/direct: files are downloaded into ACCEL_DIR and served by nginx through an
+# internal location at ACCEL_PREFIX (X-Accel-Redirect). Disabled when ACCEL_DIR is unset.
+ACCEL_DIR = (os.environ.get("DRIVE_PLAYGROUND_ACCEL_DIR") or "").strip()
+ACCEL_PREFIX = (os.environ.get("DRIVE_PLAYGROUND_ACCEL_PREFIX") or "/_drive/").strip()
+# Least recently requested files are evicted once ACCEL_DIR holds more than this
+ACCEL_MAX_BYTES = int(os.environ.get("DRIVE_PLAYGROUND_ACCEL_MAX_BYTES") or 1024 * 1024 * 1024)
 
+logger = logging.getLogger("drive_playground")
+_http_local = threading.local()
+# Serializes the cached Drive getters; a first call may run the interactive OAuth flow
+_drive_cache_lock = threading.RLock()
+# Only touched from the event loop, so no locking needed
+_list_cache: TTLCache = TTLCache(maxsize=256, ttl=LIST_CACHE_TTL)
+_read_cache: LRUCache = LRUCache(maxsize=READ_CACHE_MAX_TOTAL_BYTES, getsizeof=lambda entry: len(entry[1]))
 
-def get_api_key() -> str:
-    key = (os.environ.get("DRIVE_PLAYGROUND_API_KEY") or "").strip()
-    if not key:
+
+def _is_rate_limited(e: HttpError) -> bool:
+    if e.resp.status == 429:
+        return True
+    # error_details holds the "errors" list, or the newer "details" list when present
+    details = e.error_details if isinstance(e.error_details, list) else []
+    return e.resp.status == 403 and any(
+        isinstance(d, dict) and d.get("reason") in RATE_LIMIT_REASONS for d in details
+    )
+
+
+def _is_retryable(e: HttpError, idempotent: bool = True) -> bool:
+    return _is_rate_limited(e) or (idempotent and e.resp.status >= 500)
+
+
+def _with_retries(fn, *args, idempotent: bool = True):
+    """Run a blocking Drive call, retrying throttling/server errors (honors Retry-After).
+
+    Non-idempotent calls are only retried when throttled: a 5xx may come back after
+    Drive already applied the change.
+    """
+    for attempt in range(DRIVE_MAX_RETRIES + 1):
+        try:
+            return fn(*args)
+        except HttpError as e:
+            if attempt == DRIVE_MAX_RETRIES or not _is_retryable(e, idempotent):
+                raise
+            retry_after = e.resp.get("retry-after") or ""
+            if retry_after.isdigit():
+                delay = min(int(retry_after), RETRY_MAX_DELAY)
+            else:
+                delay = min(2**attempt, RETRY_MAX_DELAY) + random.random()
+            time.sleep(delay)
+
+
+# Read once at import; request auth compares against these bytes.
+_API_KEY = (os.environ.get("DRIVE_PLAYGROUND_API_KEY") or "").strip().encode()
+
+
+def get_api_key() -> bytes:
+    if not _API_KEY:
         raise RuntimeError("Set DRIVE_PLAYGROUND_API_KEY in the environment.")
-    return key
+    return _API_KEY
 
 
-def get_drive_service():
-    """Load credentials from env (Railway) or from token/credentials files (local)."""
-    creds = None
+def _load_stored_credentials() -> Credentials | None:
+    """Parse the saved token from env (Railway) or token.json (local); no OAuth flow."""
     token_json = (os.environ.get("GOOGLE_DRIVE_TOKEN_JSON") or "").strip()
     if token_json:
         try:
             token_data = json.loads(token_json)
-            creds = Credentials.from_authorized_user_info(token_data, SCOPES)
+            return Credentials.from_authorized_user_info(token_data, SCOPES)
         except (json.JSONDecodeError, ValueError) as e:
             raise ValueError(
                 "GOOGLE_DRIVE_TOKEN_JSON is set but invalid. Paste the full contents of token.json (from a local OAuth run)."
             ) from e
-    elif TOKEN_FILE.exists():
-        creds = Credentials.from_authorized_user_file(str(TOKEN_FILE), SCOPES)
+    if TOKEN_FILE.exists():
+        return Credentials.from_authorized_user_file(str(TOKEN_FILE), SCOPES)
+    return None
+
+
+# Parsed once at import; get_credentials only runs the OAuth flow if this is missing or unusable.
+_STORED_CREDS = _load_stored_credentials()
+
+
+def get_credentials() -> Credentials:
+    """Return the stored credentials (refreshed if expired), or run first-time OAuth locally."""
+    creds = _STORED_CREDS
     if creds and not creds.valid and creds.expired and creds.refresh_token:
         creds.refresh(Request())
     if not creds or not creds.valid:
@@ -91,53 +221,296 @@ def get_drive_service():
                 "Google OAuth credentials not found. For Railway: set GOOGLE_DRIVE_TOKEN_JSON (full token.json from a local OAuth run). "
                 "For local first run: save credentials.json here or set GOOGLE_DRIVE_CREDENTIALS_JSON."
             )
-        if not token_json and TOKEN_FILE.exists() is False:
+        if not (os.environ.get("GOOGLE_DRIVE_TOKEN_JSON") or "").strip() and TOKEN_FILE.exists() is False:
             with open(TOKEN_FILE, "w") as f:
                 f.write(creds.to_json())
-    return build("drive", "v3", credentials=creds)
+    return creds
+
+
+def get_drive_service():
+    creds = get_cached_credentials()
+
+    def request_builder(_http, *args, **kwargs):
+        return _ThreadLocalHttpRequest(creds, *args, **kwargs)
+
+    # static_discovery uses the discovery document bundled with googleapiclient (no fetch or cache).
+    return build(
+        "drive",
+        "v3",
+        http=_thread_http(creds),
+        requestBuilder=request_builder,
+        static_discovery=True,
+        cache_discovery=False,
+    )
+
+
+def _thread_http(creds) -> AuthorizedHttp:
+    """Keep-alive AuthorizedHttp for the current thread (httplib2.Http is not thread-safe)."""
+    http = getattr(_http_local, "http", None)
+    if http is None or http.credentials is not creds:
+        http = _http_local.http = AuthorizedHttp(creds, http=build_http())
+    return http
+
+
+class _ThreadLocalHttpRequest(HttpRequest):
+    """HttpRequest that uses the AuthorizedHttp of whichever thread executes it.
+
+    Requests are often built on the event loop and executed via asyncio.to_thread, so the
+    connection must be picked at run time, not when the request object is created.
+    """
+
+    def __init__(self, creds, *args, **kwargs):
+        self._creds = creds
+        super().__init__(None, *args, **kwargs)
+
+    @property
+    def http(self) -> AuthorizedHttp:
+        return _thread_http(self._creds)
+
+    @http.setter
+    def http(self, _value) -> None:
+        pass
 
 
 def get_playground_folder_id(service) -> str:
     folder_id = (os.environ.get("DRIVE_PLAYGROUND_FOLDER_ID") or "").strip()
     if folder_id:
         return folder_id
-    # Resolve by path: My Drive -> Personal -> AI Research -> OpenClaw Playground
-    parent_id = "root"
+    # Resolve by path: My Drive -> Personal -> AI Research -> OpenClaw Playground.
+    # One batched round trip fetches the root ID and every folder named like a path
+    # segment; parent links are then walked locally.
+    name_q = " or ".join(f"name = '{name}'" for name in PLAYGROUND_PATH)
+    results = {}
+    errors = []
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            errors.append(exception)
+        else:
+            results[request_id] = response
+
+    batch = service.new_batch_http_request(callback=collect)
+    batch.add(service.files().get(fileId="root", fields="id"), request_id="root")
+    batch.add(
+        service.files().list(
+            q=f"({name_q}) and mimeType = '{FOLDER_MIME_TYPE}' and trashed = false",
+            spaces="drive",
+            fields="files(id, name, parents)",
+            pageSize=1000,
+        ),
+        request_id="folders",
+    )
+    batch.execute()
+    if errors:
+        raise errors[0]
+    parent_id = results["root"]["id"]
+    folders = results["folders"].get("files", [])
     for name in PLAYGROUND_PATH:
-        result = (
-            service.files()
-            .list(
-                q=f"'{parent_id}' in parents and name = '{name}' and mimeType = 'application/vnd.google-apps.folder' and trashed = false",
-                spaces="drive",
-                fields="files(id, name)",
-                pageSize=1,
-            )
-            .execute()
+        match = next(
+            (f["id"] for f in folders if f["name"] == name and parent_id in (f.get("parents") or [])),
+            None,
         )
-        files = result.get("files", [])
-        if not files:
+        if match is None:
             raise ValueError(
                 f"Folder not found: {' / '.join(PLAYGROUND_PATH)}. "
                 f"Missing after: {name}. Create the folder in Drive or set DRIVE_PLAYGROUND_FOLDER_ID to the folder ID."
             )
-        parent_id = files[0]["id"]
+        parent_id = match
     return parent_id
 
 
-def require_api_key(x_api_key: str | None = Header(None), authorization: str | None = Header(None)):
+def _serialized(fn):
+    """Run a cached getter under _drive_cache_lock so concurrent first calls compute it once."""
+
+    @wraps(fn)
+    def wrapper():
+        with _drive_cache_lock:
+            return fn()
+
+    wrapper.cache_clear = fn.cache_clear
+    return wrapper
+
+
+@_serialized
+@lru_cache(maxsize=1)
+def get_cached_credentials() -> Credentials:
+    """Credentials shared by the cached service and the background refresher."""
+    return get_credentials()
+
+
+@_serialized
+@lru_cache(maxsize=1)
+def get_cached_service():
+    """Drive service shared across requests (credentials auto-refresh in place)."""
+    return get_drive_service()
+
+
+@_serialized
+@lru_cache(maxsize=1)
+def get_cached_folder_id() -> str:
+    """Playground folder ID, resolved once per process."""
+    return _with_retries(get_playground_folder_id, get_cached_service())
+
+
+def clear_drive_cache() -> None:
+    get_cached_folder_id.cache_clear()
+    get_cached_service.cache_clear()
+    get_cached_credentials.cache_clear()
+
+
+async def _refresh_credentials_loop() -> None:
+    """Refresh the shared token shortly before expiry so requests never block on it."""
+    while True:
+        try:
+            creds = await asyncio.to_thread(get_cached_credentials)
+            if not creds.refresh_token:
+                return
+            if creds.expiry is None:
+                # Unknown until the first inline refresh sets it; check again later.
+                await asyncio.sleep(60)
+                continue
+            now = datetime.now(timezone.utc).replace(tzinfo=None)  # google-auth uses naive UTC
+            delay = (creds.expiry - now).total_seconds() - CREDS_REFRESH_MARGIN
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            await asyncio.to_thread(creds.refresh, Request())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Background credential refresh failed; retrying in 60s", exc_info=True)
+            await asyncio.sleep(60)
+
+
+def _open_download(service, file_id: str) -> tuple[io.BytesIO, MediaIoBaseDownload]:
+    buf = io.BytesIO()
+    request = service.files().get_media(fileId=file_id)
+    return buf, MediaIoBaseDownload(buf, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+
+
+def _next_download_chunk(buf: io.BytesIO, downloader: MediaIoBaseDownload) -> tuple[bytes, bool]:
+    """Fetch the next chunk and drain it from buf so only one chunk is held in memory."""
+    _, done = _with_retries(downloader.next_chunk)
+    data = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return data, done
+
+
+def _download_bytes(service, file_id: str) -> bytes:
+    buf = io.BytesIO()
+    request = service.files().get_media(fileId=file_id)
+    downloader = MediaIoBaseDownload(buf, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+    done = False
+    while not done:
+        _, done = _with_retries(downloader.next_chunk)
+    return buf.getvalue()
+
+
+def _get_metadata(service, file_ids: list[str]) -> dict[str, dict | Exception]:
+    """Fetch BATCH_READ_META_FIELDS for many files, BATCH_MAX_REQUESTS per Drive batch round trip."""
+    results = {}
+
+    def collect(request_id, response, exception):
+        results[file_ids[int(request_id)]] = exception if exception is not None else response
+
+    for start in range(0, len(file_ids), BATCH_MAX_REQUESTS):
+        batch = service.new_batch_http_request(callback=collect)
+        for i in range(start, min(start + BATCH_MAX_REQUESTS, len(file_ids))):
+            batch.add(service.files().get(fileId=file_ids[i], fields=BATCH_READ_META_FIELDS), request_id=str(i))
+        batch.execute()
+    return results
+
+
+def _download_to_file(service, file_id: str, path: Path) -> None:
+    """Download into a temp file and rename, so nginx never sees a partial file."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+    try:
+        with open(tmp, "wb") as fh:
+            request = service.files().get_media(fileId=file_id)
+            downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+            done = False
+            while not done:
+                _, done = _with_retries(downloader.next_chunk)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    # Drop copies of older revisions of the same file
+    for old in path.parent.glob(f"{file_id}-*"):
+        if old != path and not old.name.endswith(".part"):
+            old.unlink(missing_ok=True)
+    _evict_accel_cache(path.parent, keep=path)
+
+
+def _evict_accel_cache(directory: Path, keep: Path) -> None:
+    """Delete least recently used files (by mtime, bumped on each hit) above ACCEL_MAX_BYTES.
+
+    keep is the file about to be served and is never evicted.
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and not entry.name.endswith(".part") and entry.name != keep.name:
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries) + keep.stat().st_size
+    for _, size, path in sorted(entries):
+        if total <= ACCEL_MAX_BYTES:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+async def require_api_key(x_api_key: str | None = Header(None), authorization: str | None = Header(None)):
     key = get_api_key()
-    bearer = (authorization or "").strip().removeprefix("Bearer ")
-    if (x_api_key or bearer) != key:
+    bearer = authorization[7:] if authorization and authorization.startswith("Bearer ") else ""
+    if not hmac.compare_digest((x_api_key or bearer).encode(), key):
         raise HTTPException(status_code=401, detail="Invalid or missing API key")
 
 
 # -----------------------------------------------------------------------------
 # FastAPI app
 # -----------------------------------------------------------------------------
+class ORJSONResponse(JSONResponse):
+    # fastapi.responses.ORJSONResponse is deprecated in newer FastAPI releases
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Handlers are async and push blocking Drive calls through asyncio.to_thread;
+    # size the default executor for concurrent in-flight Drive round trips.
+    executor = ThreadPoolExecutor(max_workers=DRIVE_IO_WORKERS, thread_name_prefix="drive-io")
+    if ACCEL_DIR:
+        Path(ACCEL_DIR).mkdir(parents=True, exist_ok=True)
+    asyncio.get_running_loop().set_default_executor(executor)
+    refresher = asyncio.create_task(_refresh_credentials_loop())
+    yield
+    refresher.cancel()
+    executor.shutdown(wait=False)
+
+
 app = FastAPI(
     title="Drive Playground API",
     description="List, read, and write files in OpenClaw Playground folder on Google Drive.",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
+# /list JSON and /read text compress well; tiny responses are left alone.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
+@app.exception_handler(RefreshError)
+def handle_refresh_error(_request, exc: RefreshError):
+    # Token was revoked or expired for good; rebuild the service on the next request.
+    clear_drive_cache()
+    return JSONResponse(status_code=503, content={"detail": f"Google credentials refresh failed: {exc}"})
 
 
 @app.get("/health")
@@ -145,61 +518,184 @@ def health():
     return {"status": "ok"}
 
 
-@app.get("/list", dependencies=[])
-def list_files(
-    x_api_key: str | None = Header(None),
-    authorization: str | None = Header(None),
+@app.get("/list", dependencies=[Depends(require_api_key)])
+async def list_files(
     page_token: str | None = Query(None),
     page_size: int = Query(50, ge=1, le=100),
+    if_none_match: str | None = Header(None),
+    service=Depends(get_cached_service),
+    folder_id: str = Depends(get_cached_folder_id),
 ):
-    require_api_key(x_api_key, authorization)
-    service = get_drive_service()
-    folder_id = get_playground_folder_id(service)
-    q = f"'{folder_id}' in parents and trashed = false"
-    result = (
-        service.files()
-        .list(
-            q=q,
+    key = (folder_id, page_token or "", page_size)
+    cached = _list_cache.get(key) if LIST_CACHE_ENABLED else None
+    if cached is None:
+        request = service.files().list(
+            q=LIST_Q_TMPL.format(folder_id),
             spaces="drive",
-            fields="nextPageToken, files(id, name, mimeType, modifiedTime, size)",
+            fields=LIST_FIELDS,
             pageSize=page_size,
             pageToken=page_token or "",
         )
-        .execute()
-    )
-    return {
-        "files": result.get("files", []),
-        "nextPageToken": result.get("nextPageToken"),
-    }
+        result = await asyncio.to_thread(_with_retries, request.execute)
+        # Serialize once per cache miss; hits send the stored bytes as-is.
+        content = orjson.dumps({
+            "files": result.get("files", []),
+            "nextPageToken": result.get("nextPageToken"),
+        })
+        cached = (f'"{hashlib.sha1(content).hexdigest()}"', content)
+        if LIST_CACHE_ENABLED:
+            _list_cache[key] = cached
+    etag, content = cached
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content, media_type="application/json", headers={"ETag": etag})
 
 
-@app.get("/files/{file_id}/content")
-def read_file(
+@app.get("/files/{file_id}/content", dependencies=[Depends(require_api_key)])
+async def read_file(
     file_id: str,
-    x_api_key: str | None = Header(None),
-    authorization: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+    service=Depends(get_cached_service),
+    folder_id: str = Depends(get_cached_folder_id),
 ):
-    require_api_key(x_api_key, authorization)
-    service = get_drive_service()
-    folder_id = get_playground_folder_id(service)
-    meta = service.files().get(fileId=file_id, fields="id, name, mimeType, parents").execute()
+    meta = await asyncio.to_thread(
+        _with_retries, service.files().get(fileId=file_id, fields=READ_META_FIELDS).execute
+    )
     parents = meta.get("parents") or []
     if folder_id not in parents:
         raise HTTPException(
             status_code=403,
             detail="File is not a direct child of the Playground folder. Use /list to get file IDs.",
         )
+    modified = meta.get("modifiedTime")
+    headers = {"ETag": f'"{modified}"'} if modified else {}
+    if modified and if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    # Set verbatim: media_type= would append "; charset=utf-8" to text/* whatever the encoding.
+    headers["Content-Type"] = meta.get("mimeType") or "application/octet-stream"
+    cached = _read_cache.get(file_id)
+    if modified and cached and cached[0] == modified:
+        return Response(cached[1], headers=headers)
     try:
-        request = service.files().get_media(fileId=file_id)
-        buf = io.BytesIO()
-        downloader = MediaIoBaseDownload(buf, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        buf.seek(0)
-        return PlainTextResponse(buf.read().decode("utf-8", errors="replace"))
+        # Fetch the first chunk up front so download errors still map to a 404.
+        buf, downloader = await asyncio.to_thread(_open_download, service, file_id)
+        first, done = await asyncio.to_thread(_next_download_chunk, buf, downloader)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
+    if modified and done and len(first) <= READ_CACHE_MAX_FILE_BYTES:
+        _read_cache[file_id] = (modified, first)
+
+    async def body():
+        chunk, finished = first, done
+        while True:
+            yield chunk
+            if finished:
+                break
+            chunk, finished = await asyncio.to_thread(_next_download_chunk, buf, downloader)
+
+    return StreamingResponse(body(), headers=headers)
+
+
+@app.get("/files/{file_id}/direct", dependencies=[Depends(require_api_key)])
+async def read_file_direct(
+    file_id: str,
+    service=Depends(get_cached_service),
+    folder_id: str = Depends(get_cached_folder_id),
+):
+    if not ACCEL_DIR:
+        raise HTTPException(status_code=501, detail="Direct downloads are disabled. Set DRIVE_PLAYGROUND_ACCEL_DIR.")
+    meta = await asyncio.to_thread(
+        _with_retries, service.files().get(fileId=file_id, fields=DIRECT_META_FIELDS).execute
+    )
+    parents = meta.get("parents") or []
+    if folder_id not in parents:
+        raise HTTPException(
+            status_code=403,
+            detail="File is not a direct child of the Playground folder. Use /list to get file IDs.",
+        )
+    if int(meta.get("size") or 0) > ACCEL_MAX_BYTES:
+        raise HTTPException(
+            status_code=413, detail="File too large for the direct download cache; use /files/{id}/content."
+        )
+    # One cached copy per revision; nginx serves it once it exists.
+    revision = hashlib.sha1((meta.get("modifiedTime") or "").encode()).hexdigest()[:12]
+    filename = f"{meta['id']}-{revision}"
+    path = Path(ACCEL_DIR) / filename
+    try:
+        # Mark as recently used for eviction; a missing file means a cache miss.
+        os.utime(path)
+    except FileNotFoundError:
+        try:
+            await asyncio.to_thread(_download_to_file, service, meta["id"], path)
+        except Exception as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    return Response(
+        headers={
+            "X-Accel-Redirect": f"{ACCEL_PREFIX.rstrip('/')}/{filename}",
+            "Content-Type": meta.get("mimeType") or "application/octet-stream",
+            "Content-Disposition": f"inline; filename*=UTF-8''{quote(meta.get('name') or filename)}",
+        }
+    )
+
+
+class BatchReadBody(BaseModel):
+    ids: list[str]
+
+
+@app.post("/files/batch_read", dependencies=[Depends(require_api_key)])
+async def batch_read(
+    body: BatchReadBody,
+    service=Depends(get_cached_service),
+    folder_id: str = Depends(get_cached_folder_id),
+):
+    if len(body.ids) > BATCH_READ_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_READ_MAX_ITEMS} ids per batch.")
+    # Metadata for every file in one batched round trip, then bounded parallel downloads.
+    metas = await asyncio.to_thread(_with_retries, _get_metadata, service, body.ids)
+    sem = asyncio.Semaphore(BATCH_READ_CONCURRENCY)
+    reserved = 0
+
+    async def one(file_id: str) -> dict:
+        nonlocal reserved
+        async with sem:
+            size = 0
+            try:
+                meta = metas[file_id]
+                if isinstance(meta, HttpError) and _is_retryable(meta):
+                    meta = await asyncio.to_thread(
+                        _with_retries, service.files().get(fileId=file_id, fields=BATCH_READ_META_FIELDS).execute
+                    )
+                elif isinstance(meta, Exception):
+                    raise meta
+                if folder_id not in (meta.get("parents") or []):
+                    return {"id": file_id, "error": "File is not a direct child of the Playground folder."}
+                size = int(meta.get("size") or 0)
+                if size > BATCH_READ_MAX_FILE_BYTES:
+                    size = 0
+                    return {"id": file_id, "error": "File too large for batch_read; use /files/{id}/content."}
+                # Checked and reserved without an await in between, so concurrent items can't overshoot.
+                if reserved + size > BATCH_READ_MAX_TOTAL_BYTES:
+                    size = 0
+                    return {"id": file_id, "error": "Batch size limit reached; read this file separately."}
+                reserved += size
+                modified = meta.get("modifiedTime")
+                cached = _read_cache.get(file_id)
+                if modified and cached and cached[0] == modified:
+                    data = cached[1]
+                else:
+                    data = await asyncio.to_thread(_download_bytes, service, file_id)
+                    if modified and len(data) <= READ_CACHE_MAX_FILE_BYTES:
+                        _read_cache[file_id] = (modified, data)
+            except Exception as e:
+                reserved -= size
+                return {"id": file_id, "error": str(e)}
+        return {
+            "id": file_id,
+            "mimeType": meta.get("mimeType") or "application/octet-stream",
+            "content": base64.b64encode(data).decode("ascii"),
+        }
+
+    return {"results": await asyncio.gather(*(one(file_id) for file_id in body.ids))}
 
 
 class WriteBody(BaseModel):
@@ -208,43 +704,179 @@ class WriteBody(BaseModel):
     mime_type: str = "text/plain"
 
 
-@app.post("/write")
-def write_file(
-    body: WriteBody,
-    x_api_key: str | None = Header(None),
-    authorization: str | None = Header(None),
-):
-    require_api_key(x_api_key, authorization)
-    service = get_drive_service()
-    folder_id = get_playground_folder_id(service)
-    # Check if file exists (same name in folder)
-    existing = (
-        service.files()
-        .list(
-            q=f"'{folder_id}' in parents and name = '{body.name}' and trashed = false",
-            fields="files(id)",
-            pageSize=1,
-        )
-        .execute()
-    )
-    files = existing.get("files", [])
-    meta = {"name": body.name, "mimeType": body.mime_type, "parents": [folder_id]}
+class WriteBatchBody(BaseModel):
+    items: list[WriteBody]
+
+
+def _name_query(folder_id: str, name: str) -> str:
+    escaped = name.replace("\\", "\\\\").replace("'", "\\'")
+    return NAME_Q_TMPL.format(folder_id, escaped)
+
+
+def _lookup_existing(service, folder_id: str, name: str) -> dict | None:
+    files = _with_retries(
+        service.files().list(q=_name_query(folder_id, name), fields=EXISTING_FIELDS, pageSize=1).execute
+    ).get("files", [])
+    return files[0] if files else None
+
+
+def _find_existing(service, folder_id: str, names: list[str]) -> dict[str, dict | Exception]:
+    """Look up files by name, BATCH_MAX_REQUESTS lookups per Drive batch round trip.
+
+    Names with no match are absent; a failed lookup maps to its exception.
+    """
+    found = {}
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            found[names[int(request_id)]] = exception
+        elif response.get("files"):
+            found[names[int(request_id)]] = response["files"][0]
+
+    for start in range(0, len(names), BATCH_MAX_REQUESTS):
+        batch = service.new_batch_http_request(callback=collect)
+        for i in range(start, min(start + BATCH_MAX_REQUESTS, len(names))):
+            batch.add(
+                service.files().list(q=_name_query(folder_id, names[i]), fields=EXISTING_FIELDS, pageSize=1),
+                request_id=str(i),
+            )
+        batch.execute()
+    return found
+
+
+def _execute_upload(request, idempotent: bool = True) -> dict:
+    if request.resumable is None:
+        return _with_retries(request.execute, idempotent=idempotent)
+    # Each chunk is retried on its own; the library resumes from the last acknowledged byte,
+    # so even a resumable create is safe to retry on 5xx.
+    response = None
+    while response is None:
+        _, response = _with_retries(request.next_chunk)
+    return response
+
+
+def _upload_file(service, folder_id: str, name: str, mime_type: str, fh, existing: dict | None) -> dict:
+    size = fh.seek(0, io.SEEK_END)
+    fh.seek(0)
     media = MediaIoBaseUpload(
-        io.BytesIO(body.content.encode("utf-8")),
-        mimetype=body.mime_type,
-        resumable=False,
+        fh,
+        mimetype=mime_type,
+        chunksize=UPLOAD_CHUNK_SIZE,
+        resumable=size > RESUMABLE_THRESHOLD,
     )
-    if files:
-        file_id = files[0]["id"]
-        service.files().update(fileId=file_id, body={"name": body.name}).execute()
-        service.files().update(fileId=file_id, media_body=media).execute()
+    if existing:
+        file_id = existing["id"]
+        # Metadata and content go in one update; only send a rename if it differs.
+        rename = {"name": name} if existing.get("name") != name else None
+        _execute_upload(service.files().update(fileId=file_id, body=rename, media_body=media, fields="id"))
         return {"id": file_id, "action": "updated"}
-    else:
-        created = service.files().create(body=meta, media_body=media, fields="id").execute()
-        return {"id": created["id"], "action": "created"}
+    meta = {"name": name, "mimeType": mime_type, "parents": [folder_id]}
+    # A retried multipart create after a 5xx could leave a duplicate file with the same name.
+    created = _execute_upload(service.files().create(body=meta, media_body=media, fields="id"), idempotent=False)
+    return {"id": created["id"], "action": "created"}
+
+
+async def _write_one(service, folder_id: str, name: str, mime_type: str, fh) -> dict:
+    # Check if file exists (same name in folder)
+    existing = await asyncio.to_thread(_lookup_existing, service, folder_id, name)
+    result = await asyncio.to_thread(_upload_file, service, folder_id, name, mime_type, fh, existing)
+    _list_cache.clear()
+    return result
+
+
+@app.post("/write", dependencies=[Depends(require_api_key)])
+async def write_file(
+    body: WriteBody,
+    service=Depends(get_cached_service),
+    folder_id: str = Depends(get_cached_folder_id),
+):
+    fh = io.BytesIO(body.content.encode("utf-8"))
+    return await _write_one(service, folder_id, body.name, body.mime_type, fh)
+
+
+@app.post("/write_raw", dependencies=[Depends(require_api_key)])
+async def write_raw(
+    request: APIRequest,
+    name: str = Query(...),
+    mime_type: str = Query("text/plain"),
+    service=Depends(get_cached_service),
+    folder_id: str = Depends(get_cached_folder_id),
+):
+    too_large = HTTPException(status_code=413, detail=f"Body exceeds {UPLOAD_MAX_BYTES} bytes.")
+    if int(request.headers.get("content-length") or 0) > UPLOAD_MAX_BYTES:
+        raise too_large
+    # The body goes straight to the upload as bytes, never through a str copy.
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES) as fh:
+        written = 0
+        async for chunk in request.stream():
+            written += len(chunk)
+            if written > UPLOAD_MAX_BYTES:
+                raise too_large
+            if written > UPLOAD_SPOOL_BYTES:
+                # Spilled (or about to spill) to disk: keep file I/O off the event loop.
+                await asyncio.to_thread(fh.write, chunk)
+            else:
+                fh.write(chunk)
+        fh.seek(0)
+        return await _write_one(service, folder_id, name, mime_type, fh)
+
+
+@app.post("/write_batch", dependencies=[Depends(require_api_key)])
+async def write_batch(
+    body: WriteBatchBody,
+    service=Depends(get_cached_service),
+    folder_id: str = Depends(get_cached_folder_id),
+):
+    names = [item.name for item in body.items]
+    if len(names) > WRITE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {WRITE_BATCH_MAX_ITEMS} items per batch.")
+    if len(set(names)) != len(names):
+        raise HTTPException(status_code=400, detail="Duplicate file names in batch.")
+    # Existence checks are batched; media cannot ride in a Drive batch, so uploads run in parallel.
+    existing = await asyncio.to_thread(_with_retries, _find_existing, service, folder_id, names)
+    sem = asyncio.Semaphore(WRITE_BATCH_CONCURRENCY)
+
+    async def one(item: WriteBody) -> dict:
+        async with sem:
+            try:
+                match = existing.get(item.name)
+                if isinstance(match, HttpError) and _is_retryable(match):
+                    match = await asyncio.to_thread(_lookup_existing, service, folder_id, item.name)
+                elif isinstance(match, Exception):
+                    raise match
+                fh = io.BytesIO(item.content.encode("utf-8"))
+                result = await asyncio.to_thread(
+                    _upload_file, service, folder_id, item.name, item.mime_type, fh, match
+                )
+            except Exception as e:
+                return {"name": item.name, "error": str(e)}
+        return {"name": item.name, **result}
+
+    results = await asyncio.gather(*(one(item) for item in body.items))
+    _list_cache.clear()
+    return {"results": results}
 
 
 if __name__ == "__main__":
+    from importlib.util import find_spec
+
     import uvicorn
     port = int(os.environ.get("PORT", "8765"))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Caches and credentials are per process, so each worker warms its own.
+    workers = int(os.environ.get("DRIVE_PLAYGROUND_WORKERS") or max(2, os.cpu_count() or 1))
+    if _STORED_CREDS is None:
+        # First run opens a browser for OAuth; keep that to a single process.
+        workers = 1
+    # Workers re-import this module and read the count to decide whether /list may be cached.
+    os.environ["DRIVE_PLAYGROUND_WORKERS"] = str(workers)
+    # uvloop is not available on Windows; fall back to the stdlib loop / h11 there.
+    uvicorn.run(
+        "drive_playground_service:app",
+        app_dir=str(SCRIPT_DIR),
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        loop="uvloop" if find_spec("uvloop") else "asyncio",
+        http="httptools" if find_spec("httptools") else "h11",
+        access_log=False,
+    )
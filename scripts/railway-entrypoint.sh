@@ -15,7 +15,8 @@ fi
 # Optional: start Drive Playground Python service in same container (when secrets are set as variables)
 if [ -n "$GOOGLE_DRIVE_TOKEN_JSON" ] && [ -n "$DRIVE_PLAYGROUND_API_KEY" ]; then
   DRIVE_PLAYGROUND_PORT="${DRIVE_PLAYGROUND_PORT:-8765}"
-  ( cd /app/scripts/drive_playground && gosu node python3 -m uvicorn drive_playground_service:app --host 127.0.0.1 --port "$DRIVE_PLAYGROUND_PORT" ) &
+  export DRIVE_PLAYGROUND_WORKERS="${DRIVE_PLAYGROUND_WORKERS:-2}"
+  ( cd /app/scripts/drive_playground && gosu node python3 -m uvicorn drive_playground_service:app --host 127.0.0.1 --port "$DRIVE_PLAYGROUND_PORT" --workers "$DRIVE_PLAYGROUND_WORKERS" --loop uvloop --http httptools --no-access-log ) &
   sleep 2
 fi
 